@@ -6,12 +6,16 @@ class ShippingAnalyticsService:
         self.db = db
         self.orders = db["orders"]
 
+    @staticmethod
+    def _ttn_match(date_from: str, date_to: str):
+        return {"$match": {
+            "shipment.provider": "NOVAPOSHTA",
+            "shipment.created_at": {"$gte": date_from, "$lte": date_to}
+        }}
+
     async def stats_by_day(self, date_from: str, date_to: str):
         pipeline = [
-            {"$match": {
-                "shipment.provider": "NOVAPOSHTA",
-                "shipment.created_at": {"$gte": date_from, "$lte": date_to}
-            }},
+            self._ttn_match(date_from, date_to),
             {"$addFields": {
                 "day": {"$substr": ["$shipment.created_at", 0, 10]},
                 "grand": {"$ifNull": ["$totals.grand", 0]},
@@ -27,6 +31,15 @@ class ShippingAnalyticsService:
         ]
         return await self.orders.aggregate(pipeline).to_list(length=400)
 
+    async def shipments_total(self, date_from: str, date_to: str):
+        """TTN count over the same population as stats_by_day, summed in Mongo"""
+        pipeline = [
+            self._ttn_match(date_from, date_to),
+            {"$count": "n"},
+        ]
+        rows = await self.orders.aggregate(pipeline).to_list(length=1)
+        return rows[0]["n"] if rows else 0
+
     async def top_destinations(self, date_from: str, date_to: str, limit: int = 10):
         pipeline = [
             {"$match": {
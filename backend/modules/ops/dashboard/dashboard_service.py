@@ -1,9 +1,39 @@
 # O7: Ops Dashboard Service
+import asyncio
+import time
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from modules.finance.finance_service import FinanceService
 from modules.ops.analytics.shipping_analytics_service import ShippingAnalyticsService
+from modules.pickup_control.pickup_repo import PickupRepo
+
+_FUNNEL_KEYS = (
+    "NEW", "AWAITING_PAYMENT", "PAID", "PROCESSING",
+    "SHIPPED", "DELIVERED", "CANCELED", "REFUNDED",
+)
+
+# Static part of the orders_overview pipeline - only $match varies per call
+_ORDERS_KPI_STAGES = [
+    {"$group": {
+        "_id": None,
+        **{k: {"$sum": {"$cond": [{"$eq": ["$status", k]}, 1, 0]}} for k in _FUNNEL_KEYS},
+    }},
+    # Shape the KPI fields server-side; orders_total covers funnel statuses only
+    {"$project": {
+        "_id": 0,
+        "orders_total": {"$add": [f"${k}" for k in _FUNNEL_KEYS]},
+        "delivered": "$DELIVERED",
+        "funnel": {k: f"${k}" for k in _FUNNEL_KEYS},
+    }},
+]
+
 
 class OpsDashboardService:
+    # Short in-process cache of build() results keyed by (date_from, date_to)
+    CACHE_TTL = 30
+    CACHE_MAXSIZE = 128
+    _cache = {}
+    _locks = {}
+
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.finance = FinanceService(db)
@@ -11,93 +41,112 @@ class OpsDashboardService:
         self.orders = db["orders"]
         self.notifs = db["notification_queue"]
         self.customers = db["customers"]
+        self.pickup = PickupRepo(db)
 
     async def pickup_control_stats(self):
         """O20.2: Get pickup control KPIs"""
-        def base_query(days: int):
-            return {
-                "shipment.daysAtPoint": {"$gte": days},
-                "status": {"$in": ["SHIPPED", "shipped", "PROCESSING", "processing"]}
-            }
-        
-        days2 = await self.orders.count_documents(base_query(2))
-        days5 = await self.orders.count_documents(base_query(5))
-        days7 = await self.orders.count_documents(base_query(7))
-        
-        # Calculate amount at risk
-        cursor = self.orders.find(base_query(7), {"totals.grand": 1, "total_amount": 1, "_id": 0})
-        amount = 0
-        async for o in cursor:
-            amt = float((o.get("totals") or {}).get("grand") or o.get("total_amount") or 0)
-            amount += amt
-        
-        return {
-            "days2plus": days2,
-            "days5plus": days5,
-            "days7plus": days7,
-            "amount_at_risk_7plus": round(amount, 2)
-        }
+        # Shared with /pickup-control/summary so both report the same figures
+        return await self.pickup.get_pickup_summary()
 
     async def notifications_stats(self, date_from: str, date_to: str):
         pipeline = [
             {"$match": {"created_at": {"$gte": date_from, "$lte": date_to}}},
             {"$group": {"_id": "$status", "count": {"$sum": 1}}},
         ]
-        rows = await self.notifs.aggregate(pipeline).to_list(length=20)
-        m = {r["_id"]: r["count"] for r in rows}
+        m = {r["_id"]: r["count"] async for r in self.notifs.aggregate(pipeline)}
         return {
             "sent": m.get("SENT", 0),
             "failed": m.get("FAILED", 0),
             "pending": m.get("PENDING", 0),
         }
 
-    async def orders_funnel(self, date_from: str, date_to: str):
+    async def orders_overview(self, date_from: str, date_to: str):
+        """Orders KPI (total, delivered, funnel) in one pass"""
         pipeline = [
             {"$match": {"created_at": {"$gte": date_from, "$lte": date_to}}},
-            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            *_ORDERS_KPI_STAGES,
         ]
-        rows = await self.orders.aggregate(pipeline).to_list(length=50)
-        m = {r["_id"]: r["count"] for r in rows}
-        return {
-            "NEW": m.get("NEW", 0),
-            "AWAITING_PAYMENT": m.get("AWAITING_PAYMENT", 0),
-            "PAID": m.get("PAID", 0),
-            "PROCESSING": m.get("PROCESSING", 0),
-            "SHIPPED": m.get("SHIPPED", 0),
-            "DELIVERED": m.get("DELIVERED", 0),
-            "CANCELED": m.get("CANCELED", 0),
-            "REFUNDED": m.get("REFUNDED", 0),
+        rows = await self.orders.aggregate(pipeline).to_list(length=1)
+        # $group over an empty range yields no document - zero-fill then
+        return rows[0] if rows else {
+            "orders_total": 0,
+            "delivered": 0,
+            "funnel": dict.fromkeys(_FUNNEL_KEYS, 0),
         }
 
     async def crm_stats(self):
         pipeline = [
             {"$group": {"_id": "$segment", "count": {"$sum": 1}}}
         ]
-        rows = await self.customers.aggregate(pipeline).to_list(20)
-        return {r["_id"]: r["count"] for r in rows}
+        return {r["_id"]: r["count"] async for r in self.customers.aggregate(pipeline)}
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls._cache.clear()
+
+    @classmethod
+    def _cache_get(cls, key):
+        hit = cls._cache.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        cls._cache.pop(key, None)
+        return None
+
+    @classmethod
+    def _cache_put(cls, key, value):
+        now = time.monotonic()
+        if len(cls._cache) >= cls.CACHE_MAXSIZE:
+            for k in [k for k, (exp, _) in cls._cache.items() if exp <= now]:
+                del cls._cache[k]
+            while len(cls._cache) >= cls.CACHE_MAXSIZE:
+                del cls._cache[next(iter(cls._cache))]
+        cls._cache[key] = (now + cls.CACHE_TTL, value)
 
     async def build(self, date_from: str, date_to: str):
-        finance_summary = await self.finance.summary(date_from, date_to)
-        finance_daily = await self.finance.daily(date_from, date_to)
-        shipping_daily = await self.shipping.stats_by_day(date_from, date_to)
-        funnel = await self.orders_funnel(date_from, date_to)
-        notif = await self.notifications_stats(date_from, date_to)
-        crm = await self.crm_stats()
-        pickup = await self.pickup_control_stats()
+        key = (date_from, date_to)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        # One in-flight build per key - concurrent callers wait for it
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                cached = self._cache_get(key)
+                if cached is None:
+                    cached = await self._build(date_from, date_to)
+                    self._cache_put(key, cached)
+        finally:
+            # Drop the lock once nobody waits on it - failed builds included
+            if not lock.locked():
+                self._locks.pop(key, None)
+        return cached
+
+    async def _build(self, date_from: str, date_to: str):
+        # Sections are independent - run the queries concurrently
+        (finance_summary, finance_daily, shipping_daily, shipments,
+         overview, notif, crm, pickup) = await asyncio.gather(
+            self.finance.summary(date_from, date_to),
+            self.finance.daily(date_from, date_to),
+            self.shipping.stats_by_day(date_from, date_to),
+            self.shipping.shipments_total(date_from, date_to),
+            self.orders_overview(date_from, date_to),
+            self.notifications_stats(date_from, date_to),
+            self.crm_stats(),
+            self.pickup_control_stats(),
+        )
 
         revenue = float(finance_summary.get("revenue", 0))
         net = float(finance_summary.get("net", 0))
-        shipments = sum(int(x.get("ttnCount", 0)) for x in shipping_daily)
-        delivered = funnel.get("DELIVERED", 0)
 
         return {
             "range": {"from": date_from, "to": date_to},
             "kpi": {
                 "revenue": revenue,
                 "net": net,
-                "orders_total": sum(funnel.values()),
+                "orders_total": overview["orders_total"],
                 "shipments": shipments,
-                "delivered": delivered,
+                "delivered": overview["delivered"],
                 "notifications": notif,
                 "crm_segments": crm,
             },
@@ -110,6 +159,6 @@ class OpsDashboardService:
                 "daily": shipping_daily,
             },
             "orders": {
-                "funnel": funnel,
+                "funnel": overview["funnel"],
             },
         }
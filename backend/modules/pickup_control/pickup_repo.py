@@ -8,6 +8,23 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# Backs the risk list: daysAtPoint range + (daysAtPoint, amount) sort, status from index keys.
+# Created in ensure_indexes and server startup; the planner picks it without a hint.
+RISK_LIST_INDEX = [("shipment.daysAtPoint", -1), ("totals.grand", -1), ("status", 1)]
+
+# Fields rendered by the admin risk tables and the Telegram bot risk list
+RISK_LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "status": 1,
+    "total_amount": 1,
+    "totals.grand": 1,
+    "shipment": 1,
+    "reminders.pickup": 1,
+    "delivery.recipient.phone": 1,  # bot send_risk_list builds its TTN buttons from it
+}
+
+
 def utcnow_iso():
     return datetime.now(timezone.utc).isoformat()
 
@@ -28,7 +45,7 @@ class PickupRepo:
         try:
             await self.dedupe.create_index("key", unique=True)
             await self.orders.create_index("shipment.ttn")
-            await self.orders.create_index("shipment.daysAtPoint")
+            await self.orders.create_index(RISK_LIST_INDEX)
             await self.timeline.create_index([("phone", 1), ("ts", -1)])
         except Exception as e:
             logger.warning(f"Index creation warning: {e}")
@@ -48,37 +65,84 @@ class PickupRepo:
             "shipment.daysAtPoint": {"$gte": min_days},
             "status": {"$in": ["shipped", "processing", "SHIPPED", "PROCESSING"]}
         }
-        cur = self.orders.find(q, {"_id": 0}).sort("shipment.daysAtPoint", -1).limit(limit)
+        cur = self.orders.find(q, RISK_LIST_PROJECTION) \
+            .sort("shipment.daysAtPoint", -1) \
+            .limit(limit)
         return [x async for x in cur]
 
-    async def get_pickup_kpi(self) -> Dict:
-        """Get pickup KPI stats"""
+    async def _pickup_risk_totals(self) -> Dict:
+        """2+/5+/7+ day counts and 7+ day amount at risk in one aggregation; backs /kpi and /summary"""
+        # Same truthiness as `totals.grand or total_amount or 0`: 0/""/null grand falls back
+        amount = {"$cond": [
+            {"$in": [{"$ifNull": ["$totals.grand", None]}, [None, 0, ""]]},
+            "$total_amount",
+            "$totals.grand",
+        ]}
         pipeline = [
             {"$match": {
-                "shipment.daysAtPoint": {"$exists": True, "$gte": 2},
-                "status": {"$in": ["shipped", "processing", "SHIPPED", "PROCESSING"]}
+                "shipment.daysAtPoint": {"$gte": 2},
+                "status": {"$in": ["SHIPPED", "shipped", "PROCESSING", "processing"]}
             }},
             {"$group": {
                 "_id": None,
-                "at_2plus": {"$sum": {"$cond": [{"$gte": ["$shipment.daysAtPoint", 2]}, 1, 0]}},
-                "at_5plus": {"$sum": {"$cond": [{"$gte": ["$shipment.daysAtPoint", 5]}, 1, 0]}},
-                "at_7plus": {"$sum": {"$cond": [{"$gte": ["$shipment.daysAtPoint", 7]}, 1, 0]}},
-                "amount_at_risk": {"$sum": {"$cond": [
+                "days2plus": {"$sum": 1},
+                "days5plus": {"$sum": {"$cond": [{"$gte": ["$shipment.daysAtPoint", 5]}, 1, 0]}},
+                "days7plus": {"$sum": {"$cond": [{"$gte": ["$shipment.daysAtPoint", 7]}, 1, 0]}},
+                "amount": {"$sum": {"$cond": [
                     {"$gte": ["$shipment.daysAtPoint", 7]},
-                    "$total_amount",
+                    {"$convert": {"input": amount, "to": "double", "onError": 0, "onNull": 0}},
                     0
-                ]}}
-            }}
+                ]}},
+            }},
         ]
         rows = await self.orders.aggregate(pipeline).to_list(1)
-        if rows:
-            return {
-                "at_point_2plus": rows[0].get("at_2plus", 0),
-                "at_point_5plus": rows[0].get("at_5plus", 0),
-                "at_point_7plus": rows[0].get("at_7plus", 0),
-                "amount_at_risk": float(rows[0].get("amount_at_risk", 0))
-            }
-        return {"at_point_2plus": 0, "at_point_5plus": 0, "at_point_7plus": 0, "amount_at_risk": 0}
+        r = rows[0] if rows else {}
+        return {
+            "days2plus": r.get("days2plus", 0),
+            "days5plus": r.get("days5plus", 0),
+            "days7plus": r.get("days7plus", 0),
+            "amount": float(r.get("amount", 0)),
+        }
+
+    async def get_pickup_kpi(self) -> Dict:
+        """Get pickup KPI stats"""
+        t = await self._pickup_risk_totals()
+        return {
+            "at_point_2plus": t["days2plus"],
+            "at_point_5plus": t["days5plus"],
+            "at_point_7plus": t["days7plus"],
+            "amount_at_risk": t["amount"]
+        }
+
+    async def get_pickup_summary(self) -> Dict:
+        """Pickup summary KPIs (dashboard + /summary)"""
+        t = await self._pickup_risk_totals()
+        return {
+            "days2plus": t["days2plus"],
+            "days5plus": t["days5plus"],
+            "days7plus": t["days7plus"],
+            "amount_at_risk_7plus": round(t["amount"], 2)
+        }
+
+    async def get_reminder_target(self, ttn: str) -> Optional[Dict]:
+        """Get order_id, phone and days at point for TTN (server-side projection)"""
+        pipeline = [
+            {"$match": {"shipment.ttn": ttn}},
+            {"$limit": 1},
+            {"$project": {
+                "_id": 0,
+                "order_id": "$id",
+                # Empty recipient phone falls back to buyer_phone too, not just null/missing
+                "phone": {"$cond": [
+                    {"$in": [{"$ifNull": ["$delivery.recipient.phone", None]}, [None, ""]]},
+                    "$buyer_phone",
+                    "$delivery.recipient.phone",
+                ]},
+                "days": {"$ifNull": ["$shipment.daysAtPoint", 0]},
+            }},
+        ]
+        rows = await self.orders.aggregate(pipeline).to_list(1)
+        return rows[0] if rows else None
 
     async def get_user_prefs(self, phone: str) -> Dict:
         """Get user preferences for notifications"""
@@ -149,7 +213,7 @@ class PickupRepo:
             return False
 
     async def enqueue_sms(self, phone: str, text: str, dedupe_key: str, meta: Dict):
-        """Add SMS to notification queue"""
+        """Add SMS to notification queue (idempotent on dedupe_key)"""
         doc = {
             "type": "SMS",
             "channel": "sms",
@@ -163,10 +227,15 @@ class PickupRepo:
             "created_at": utcnow_iso(),
         }
         try:
-            await self.outbox.insert_one(doc)
-            return True
+            # Single upsert: inserts once, a repeated dedupe_key is a no-op
+            res = await self.outbox.update_one(
+                {"dedupe_key": dedupe_key},
+                {"$setOnInsert": doc},
+                upsert=True
+            )
+            return res.upserted_id is not None
         except Exception as e:
-            logger.warning(f"SMS enqueue failed (likely duplicate): {e}")
+            logger.warning(f"SMS enqueue failed: {e}")
             return False
 
     async def enqueue_email(self, email: str, subject: str, body: str, dedupe_key: str, meta: Dict):
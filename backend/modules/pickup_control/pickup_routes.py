@@ -2,50 +2,51 @@
 O20.2: Pickup Control Routes - Admin API endpoints (Extended)
 """
 from fastapi import APIRouter, Depends, HTTPException
+from functools import lru_cache
 from typing import Optional
 from datetime import datetime, timezone, timedelta
+import time
 
 from core.db import db
 from core.security import get_current_admin
-from modules.pickup_control.pickup_repo import PickupRepo
+from modules.pickup_control.pickup_repo import PickupRepo, RISK_LIST_PROJECTION
 from modules.pickup_control.pickup_engine import PickupControlEngine
+from modules.pickup_control.pickup_types import PickupRunRequest, MuteTTNRequest, SendReminderRequest
+from modules.pickup_control.pickup_templates import sms_pickup_template
+from modules.ops.dashboard.dashboard_service import OpsDashboardService
+
+try:
+    from modules.delivery.np.np_tracking_service import NPTrackingService
+except ImportError:
+    NPTrackingService = None
 
 router = APIRouter(prefix="/pickup-control", tags=["Pickup Control"])
 
+orders_col = db["orders"]
+
+
+@lru_cache
+def _repo() -> PickupRepo:
+    return PickupRepo(db)
+
+
+def repo_dep() -> PickupRepo:
+    """Shared PickupRepo - collection handles are built once"""
+    return _repo()
+
 
 # ============= O20.2: NEW ENDPOINTS =============
 
 @router.get("/summary")
-async def get_pickup_summary(current_user: dict = Depends(get_current_admin)):
+async def get_pickup_summary(
+    current_user: dict = Depends(get_current_admin),
+    repo: PickupRepo = Depends(repo_dep),
+):
     """
     O20.2: Get pickup control summary KPIs
     Returns: days2plus, days5plus, days7plus, amount_at_risk_7plus
     """
-    orders = db["orders"]
-    
-    def base_query(days: int):
-        return {
-            "shipment.daysAtPoint": {"$gte": days},
-            "status": {"$in": ["SHIPPED", "shipped", "PROCESSING", "processing"]}
-        }
-    
-    days2 = await orders.count_documents(base_query(2))
-    days5 = await orders.count_documents(base_query(5))
-    days7 = await orders.count_documents(base_query(7))
-    
-    # Calculate amount at risk (7+ days)
-    cursor = orders.find(base_query(7), {"totals.grand": 1, "total_amount": 1, "_id": 0})
-    amount = 0
-    async for o in cursor:
-        amt = float((o.get("totals") or {}).get("grand") or o.get("total_amount") or 0)
-        amount += amt
-    
-    return {
-        "days2plus": days2,
-        "days5plus": days5,
-        "days7plus": days7,
-        "amount_at_risk_7plus": round(amount, 2)
-    }
+    return await repo.get_pickup_summary()
 
 
 @router.post("/send")
@@ -65,12 +66,14 @@ async def manual_send_reminder(
         raise HTTPException(status_code=400, detail="ttn and level required")
     
     # Find order
-    order = await db["orders"].find_one({"shipment.ttn": ttn}, {"_id": 0})
+    order = await orders_col.find_one(
+        {"shipment.ttn": ttn},
+        {"_id": 0, "id": 1, "reminders.pickup": 1, "shipment.daysAtPoint": 1,
+         "delivery.recipient.phone": 1, "buyer_phone": 1}
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    repo = PickupRepo(db)
-    
     # Check cooldown
     reminders = (order.get("reminders") or {}).get("pickup") or {}
     cooldown_until = reminders.get("cooldownUntil")
@@ -97,7 +100,6 @@ async def manual_send_reminder(
         return {"ok": False, "reason": "duplicate", "dedupe_key": dedupe_key}
     
     # Get SMS template
-    from modules.pickup_control.pickup_templates import sms_pickup_template
     days_at = (order.get("shipment") or {}).get("daysAtPoint") or 0
     text = sms_pickup_template(level, ttn, order_id=order.get("id"), days=int(days_at))
     
@@ -124,7 +126,7 @@ async def manual_send_reminder(
     if level not in sent_levels:
         sent_levels.append(level)
     
-    await db["orders"].update_one(
+    await orders_col.update_one(
         {"shipment.ttn": ttn},
         {"$set": {
             "reminders.pickup.sentLevels": sent_levels,
@@ -163,7 +165,7 @@ async def mute_ttn_reminder(
     
     until = datetime.now(timezone.utc) + timedelta(hours=hours)
     
-    result = await db["orders"].update_one(
+    result = await orders_col.update_one(
         {"shipment.ttn": ttn},
         {"$set": {"reminders.pickup.cooldownUntil": until.isoformat()}}
     )
@@ -172,7 +174,7 @@ async def mute_ttn_reminder(
         raise HTTPException(status_code=404, detail="Order not found")
     
     # Timeline event
-    order = await db["orders"].find_one({"shipment.ttn": ttn}, {"delivery.recipient.phone": 1})
+    order = await orders_col.find_one({"shipment.ttn": ttn}, {"delivery.recipient.phone": 1})
     phone = ((order.get("delivery") or {}).get("recipient") or {}).get("phone") if order else None
     if phone:
         await db["timeline_events"].insert_one({
@@ -202,7 +204,7 @@ async def unmute_ttn_reminder(
     if not ttn:
         raise HTTPException(status_code=400, detail="ttn required")
     
-    result = await db["orders"].update_one(
+    result = await orders_col.update_one(
         {"shipment.ttn": ttn},
         {"$unset": {"reminders.pickup.cooldownUntil": ""}}
     )
@@ -221,7 +223,7 @@ async def find_by_ttn(
     """
     O20.2: Find order by TTN
     """
-    order = await db["orders"].find_one({"shipment.ttn": ttn}, {"_id": 0})
+    order = await orders_col.find_one({"shipment.ttn": ttn}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -247,7 +249,7 @@ async def get_risk_list(
         "status": {"$in": ["SHIPPED", "shipped", "PROCESSING", "processing"]}
     }
     
-    cursor = db["orders"].find(query, {"_id": 0}) \
+    cursor = orders_col.find(query, RISK_LIST_PROJECTION) \
         .sort([
             ("shipment.daysAtPoint", -1),
             ("totals.grand", -1)
@@ -256,7 +258,7 @@ async def get_risk_list(
         .limit(limit)
     
     items = [item async for item in cursor]
-    total = await db["orders"].count_documents(query)
+    total = await orders_col.count_documents(query)
     
     return {
         "items": items,
@@ -268,31 +270,26 @@ async def get_risk_list(
 
 
 @router.get("/kpi")
-async def get_pickup_kpi(current_user: dict = Depends(get_current_admin)):
+async def get_pickup_kpi(
+    repo: PickupRepo = Depends(repo_dep),
+    current_user: dict = Depends(get_current_admin)
+):
     """Get pickup control KPI stats"""
-    repo = PickupRepo(db)
     kpi = await repo.get_pickup_kpi()
     return kpi
 
 
 @router.post("/run")
 async def run_pickup_control(
-    body: dict = {},
+    body: PickupRunRequest = PickupRunRequest(),
     current_user: dict = Depends(get_current_admin)
 ):
     """Manually trigger pickup control processing"""
-    limit = int(body.get("limit", 300))
-    
     # Get NP service if available
-    np_service = None
-    try:
-        from modules.delivery.np.np_tracking_service import NPTrackingService
-        np_service = NPTrackingService(db)
-    except ImportError:
-        pass
-    
+    np_service = NPTrackingService(db) if NPTrackingService else None
     engine = PickupControlEngine(db, np_service=np_service)
-    result = await engine.run_once(limit=limit)
+    result = await engine.run_once(limit=body.limit)
+    OpsDashboardService.invalidate_cache()
     return result
 
 
@@ -302,65 +299,50 @@ async def process_single_ttn(
     current_user: dict = Depends(get_current_admin)
 ):
     """Process single TTN manually"""
-    np_service = None
-    try:
-        from modules.delivery.np.np_tracking_service import NPTrackingService
-        np_service = NPTrackingService(db)
-    except ImportError:
-        pass
-    
+    np_service = NPTrackingService(db) if NPTrackingService else None
     engine = PickupControlEngine(db, np_service=np_service)
     result = await engine.process_single_ttn(ttn)
+    OpsDashboardService.invalidate_cache()
     return result
 
 
 @router.post("/mute/{ttn}")
 async def mute_ttn(
     ttn: str,
-    body: dict = {},
+    body: MuteTTNRequest = MuteTTNRequest(),
+    repo: PickupRepo = Depends(repo_dep),
     current_user: dict = Depends(get_current_admin)
 ):
     """Mute reminders for specific TTN"""
-    days = int(body.get("days", 7))
-    repo = PickupRepo(db)
-    await repo.mute_ttn(ttn, days=days)
-    return {"ok": True, "ttn": ttn, "muted_days": days}
+    await repo.mute_ttn(ttn, days=body.days)
+    return {"ok": True, "ttn": ttn, "muted_days": body.days}
 
 
 @router.post("/send-reminder/{ttn}")
 async def send_reminder_now(
     ttn: str,
-    body: dict = {},
+    body: SendReminderRequest = SendReminderRequest(),
+    repo: PickupRepo = Depends(repo_dep),
     current_user: dict = Depends(get_current_admin)
 ):
     """Force send reminder for TTN right now"""
-    level = body.get("level", "D5")
+    level = body.level
     
     # Find order
-    order = await db["orders"].find_one({"shipment.ttn": ttn}, {"_id": 0})
-    if not order:
+    target = await repo.get_reminder_target(ttn)
+    if not target:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Get phone
-    delivery = order.get("delivery") or {}
-    recipient = delivery.get("recipient") or {}
-    phone = recipient.get("phone") or order.get("buyer_phone")
-    
+    phone = target.get("phone")
     if not phone:
         raise HTTPException(status_code=400, detail="No phone number")
     
-    # Import templates
-    from modules.pickup_control.pickup_templates import sms_pickup_template
-    
-    # Get days at point
-    days_at = (order.get("shipment") or {}).get("daysAtPoint") or 0
-    
-    text = sms_pickup_template(level, ttn, order_id=order.get("id"), days=int(days_at))
-    dedupe_key = f"pickup_manual:{ttn}:{datetime.now(timezone.utc).isoformat()}"
+    order_id = target.get("order_id")
+    text = sms_pickup_template(level, ttn, order_id=order_id, days=int(target.get("days") or 0))
+    dedupe_key = f"pickup_manual:{ttn}:{time.time_ns()}"
     
-    repo = PickupRepo(db)
     await repo.enqueue_sms(phone, text, dedupe_key, {
-        "order_id": order.get("id"),
+        "order_id": order_id,
         "ttn": ttn,
         "level": level,
         "manual": True
@@ -375,7 +357,10 @@ async def get_order_pickup_status(
     current_user: dict = Depends(get_current_admin)
 ):
     """Get pickup status for specific order"""
-    order = await db["orders"].find_one({"id": order_id}, {"_id": 0})
+    order = await orders_col.find_one(
+        {"id": order_id},
+        {"_id": 0, "id": 1, "status": 1, "shipment": 1, "reminders.pickup": 1}
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
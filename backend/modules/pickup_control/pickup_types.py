@@ -42,3 +42,15 @@ class PickupKPI(BaseModel):
     at_point_7plus: int = 0
     amount_at_risk: float = 0.0
     reminder_sent_today: int = 0
+
+
+class PickupRunRequest(BaseModel):
+    limit: int = 300
+
+
+class MuteTTNRequest(BaseModel):
+    days: int = 7
+
+
+class SendReminderRequest(BaseModel):
+    level: str = "D5"
@@ -3616,6 +3616,7 @@ app.include_router(analytics_router, prefix="/api/v2/admin", tags=["Analytics In
 
 # O20: Pickup Control router
 from modules.pickup_control.pickup_routes import router as pickup_control_router
+from modules.pickup_control.pickup_repo import RISK_LIST_INDEX
 app.include_router(pickup_control_router, prefix="/api/v2/admin", tags=["Pickup Control"])
 
 app.add_middleware(
@@ -3641,7 +3642,10 @@ async def startup_init():
     await db.orders.create_index("id", unique=True)
     await db.orders.create_index("user_id")
     await db.orders.create_index("status")
-    await db.orders.create_index("created_at")
+    # O7: dashboard funnel ($match created_at + $group status); the prefix serves created_at sorts/ranges
+    await db.orders.create_index([("created_at", 1), ("status", 1)])
+    # O20: pickup risk list (PickupRepo / pickup_routes)
+    await db.orders.create_index(RISK_LIST_INDEX)
     
     # Payment events - webhook idempotency
     await db.payment_events.create_index(
@@ -3669,6 +3673,7 @@ async def startup_init():
     # O2: Notification queue
     await db.notification_queue.create_index("status")
     await db.notification_queue.create_index("dedupe_key", unique=True, sparse=True)
+    await db.notification_queue.create_index([("created_at", 1), ("status", 1)])
     
     # O5: Finance ledger
     await db.finance_ledger.create_index("order_id")
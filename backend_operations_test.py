@@ -26,6 +26,12 @@ import time
 # Load environment variables from frontend .env for public URL
 load_dotenv('/app/frontend/.env')
 
+# Fields each response must carry
+DASHBOARD_FIELDS = frozenset({"range", "kpi", "finance", "shipping", "orders"})
+DASHBOARD_KPI_FIELDS = frozenset({"revenue", "net", "orders_total", "shipments", "delivered", "notifications", "crm_segments"})
+CUSTOMER_DETAIL_FIELDS = frozenset({"customer", "orders"})
+FINANCE_SUMMARY_FIELDS = frozenset({"revenue", "net", "shipping_cost", "range"})
+
 class OperationsLayerTester:
     def __init__(self, base_url=None):
         self.base_url = base_url or os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:3000')
@@ -137,11 +143,8 @@ class OperationsLayerTester:
         
         if response["success"]:
             data = response["data"]
-            required_fields = ["range", "kpi", "finance", "shipping", "orders"]
-            has_required = all(field in data for field in required_fields)
-            
-            kpi_fields = ["revenue", "net", "orders_total", "shipments", "delivered", "notifications", "crm_segments"]
-            kpi_complete = all(field in data.get("kpi", {}) for field in kpi_fields)
+            has_required = DASHBOARD_FIELDS.issubset(data)
+            kpi_complete = DASHBOARD_KPI_FIELDS.issubset(data.get("kpi", {}))
             
             return self.log_result("O7 Ops Dashboard", has_required and kpi_complete,
                 f"Fields present: {list(data.keys())}")
@@ -197,7 +200,7 @@ class OperationsLayerTester:
         
         if response["success"]:
             data = response["data"]
-            if "customer" in data and "orders" in data:
+            if CUSTOMER_DETAIL_FIELDS.issubset(data):
                 return self.log_result("O5 Customer Detail", True,
                     f"Customer with {len(data['orders'])} orders")
             else:
@@ -231,8 +234,7 @@ class OperationsLayerTester:
         
         if response["success"]:
             data = response["data"]
-            required_fields = ["revenue", "net", "shipping_cost", "range"]
-            has_required = all(field in data for field in required_fields)
+            has_required = FINANCE_SUMMARY_FIELDS.issubset(data)
             return self.log_result("O5 Finance Summary", has_required,
                 f"Revenue: {data.get('revenue', 0)}, Net: {data.get('net', 0)}")
         else:
@@ -11,18 +11,144 @@ Tests admin APIs:
 - Admin authentication
 """
 
+import argparse
+import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
 import sys
-import uuid
-from datetime import datetime
+import json
+import time
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from frontend .env for public URL
-load_dotenv('/app/frontend/.env')
+try:
+    import orjson  # optional: faster response parsing
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+try:
+    import vcr  # optional: record/replay HTTP for --replay runs
+except ImportError:
+    vcr = None
+
+FRONTEND_ENV_PATH = '/app/frontend/.env'
+CASSETTE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ystore_admin.yaml')
+# Never let credentials or issued tokens reach the cassette (it is also gitignored)
+CASSETTE_SECRET_FIELDS = ('email', 'password')
+CASSETTE_SECRET_KEYS = frozenset({'token', 'access_token'})
+CASSETTE_REDACTED = '<redacted>'
+# Recorded in place of the real bearer so authed and anonymous calls stay distinguishable
+CASSETTE_AUTH_PLACEHOLDER = 'Bearer <redacted>'
+
+# Admin token reused across runs until it expires (skips /auth/login)
+TOKEN_CACHE_PATH = os.path.expanduser('~/.ystore_test_token.json')
+TOKEN_CACHE_TTL = 3000
+# Stop reusing a token this many seconds before its JWT exp claim
+TOKEN_EXPIRY_MARGIN = 60
+
+# Default for printing every request URL; -v on the command line turns it on too
+VERBOSE = bool(os.environ.get('VERBOSE'))
+
+# (connect, read) timeouts: read-only GETs fail fast so retries fit inside a few seconds,
+# writes (engine run, daily rebuild) can legitimately take longer server-side.
+# Connect sits just over 3s, the initial TCP SYN retransmit window, so one lost SYN
+# is retried by the kernel before requests gives up.
+READ_TIMEOUT = (3.05, 5)
+WRITE_TIMEOUT = (3.05, 25)
+
+# Overall wall-clock cap on one send(), retries and backoff included. A single write
+# attempt (connect + read) fits inside it; no retry starts unless it can still finish in time.
+REQUEST_DEADLINE = 30
+# A custom timeout too long for that still gets room for one retry after a full attempt
+RETRY_HEADROOM = 1
+
+# Worker threads for concurrent probes; the connection pool is sized to match
+MAX_WORKERS = 16
+
+# Sentinel that tells the log writer thread to stop
+_LOG_DONE = object()
+
+# (deadline, worst-case seconds of one attempt) of the send() running on this thread
+_send_budget = threading.local()
+
+
+def request_never_sent(exc):
+    """True when a requests ConnectionError means nothing reached the server (DNS, refused, connect timeout)"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.exceptions.ConnectionError) or not exc.args:
+        return False
+    # Exhausted retries arrive wrapped in MaxRetryError; its reason is the last failure.
+    # NewConnectionError/NameResolutionError subclass ConnectTimeoutError in urllib3 2.x.
+    reason = getattr(exc.args[0], 'reason', exc.args[0])
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class DeadlineRetry(Retry):
+    """Retry that refuses any retry which could end past the current send()'s deadline"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        budget = getattr(_send_budget, 'value', None)
+        if budget is not None:
+            deadline, attempt = budget
+            wait = None
+            if response is not None and self.respect_retry_after_header:
+                wait = self.get_retry_after(response)
+            if wait is None:
+                wait = new_retry.get_backoff_time() + self.backoff_jitter
+            if time.monotonic() + wait + attempt > deadline:
+                raise MaxRetryError(_pool, url, error or ResponseError("request deadline exceeded"))
+        return new_retry
 
 class YStoreAPITester:
-    def __init__(self, base_url=None):
+    # Parameterised endpoint paths, pre-bound once: self._URLS["mute"](ttn)
+    _URLS = {
+        "guard_mute": "/v2/admin/guard/incident/{}/mute".format,
+        "guard_resolve": "/v2/admin/guard/incident/{}/resolve".format,
+        "timeline": "/v2/admin/timeline/{}".format,
+        "mute": "/v2/admin/pickup-control/mute/{}".format,
+        "reminder": "/v2/admin/pickup-control/send-reminder/{}".format,
+    }
+
+    # Constant POST bodies, encoded once and sent as-is
+    _BODIES = {
+        "guard_mute": json_dumps({"hours": 1}),
+        "daily_rebuild": json_dumps({"days": 3}),  # Small number for testing
+        "pickup_run": json_dumps({"limit": 50}),  # Small limit for testing
+        "pickup_mute": json_dumps({"days": 7}),
+        "pickup_reminder": json_dumps({"level": "D5"}),
+    }
+
+    # Expected response shapes: (fields that must all be present, fields of which at least one must be)
+    _SHAPES = {
+        "guard_incidents": (frozenset({"items"}), frozenset()),
+        "risk_distribution": (frozenset({"distribution"}), frozenset()),
+        "timeline": (frozenset({"events", "count"}), frozenset()),
+        "ops_kpi": (frozenset(), frozenset({"revenue", "orders", "aov", "delivered"})),
+        "daily_rebuild": (frozenset({"ok", "rebuilt"}), frozenset()),
+        "pickup_kpi": (frozenset(), frozenset({"at_point_2plus", "at_point_5plus", "at_point_7plus", "amount_at_risk"})),
+        "pickup_risk_list": (frozenset({"items", "count", "filter_days"}), frozenset()),
+        "pickup_run": (frozenset({"ok", "processed", "sent", "high_risk_count", "errors"}), frozenset()),
+        "pickup_mute": (frozenset({"ok", "ttn", "muted_days"}), frozenset()),
+        "pickup_reminder": (frozenset({"ok", "ttn"}), frozenset()),
+    }
+
+    def __init__(self, base_url=None, verbose=VERBOSE, use_token_cache=True, max_workers=MAX_WORKERS):
+        # Load environment variables from frontend .env for public URL
+        if base_url is None and not os.environ.get('REACT_APP_BACKEND_URL') and os.path.exists(FRONTEND_ENV_PATH):
+            from dotenv import load_dotenv
+            load_dotenv(FRONTEND_ENV_PATH)
+        
         # Use localhost as fallback since external routing seems to have issues
         if base_url is None:
             external_url = os.environ.get('REACT_APP_BACKEND_URL', '')
@@ -36,67 +162,181 @@ class YStoreAPITester:
         else:
             self.base_url = base_url
             self.fallback_url = None
+        self.api_root = self.base_url.rstrip('/') + '/api'
+        self.verbose = verbose
+        self.use_token_cache = use_token_cache
+        self.max_workers = max_workers
             
+        # One pooled session - connections are reused across all test calls
+        self.session = requests.Session()
+        # Transient gateway/rate-limit failures are retried with jittered backoff, bounded by
+        # REQUEST_DEADLINE. 401/403 are deliberately absent - the auth-required sweep expects them
+        # on the first try. Read/status retries are for GET/HEAD only: a POST that timed out may
+        # already have run (engine run, reminders), so writes are retried on connect errors only.
+        retry = DeadlineRetry(
+            total=3,
+            connect=2,
+            read=2,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        
         self.admin_token = None
         self.tests_run = 0
         self.tests_passed = 0
+        self._lock = threading.Lock()  # counters are updated from worker threads
+        # All progress lines go through one queue and a single writer thread
+        self._log_q = queue.Queue()
+        self._drainer = threading.Thread(target=self._drain_log, daemon=True)
+        self._drainer.start()
+        self._fallback_lock = threading.Lock()  # concurrent probes may all hit a dead external URL
+        # YSTORE_TEST_TIMEOUT overrides the per-method defaults: "10" or "3.05,10" (connect,read)
+        self.timeout = self.parse_timeout(os.environ.get('YSTORE_TEST_TIMEOUT'))
+        if self.timeout is not None and self.deadline_for(self.timeout) > REQUEST_DEADLINE:
+            self.log(f"YSTORE_TEST_TIMEOUT={self.timeout} leaves no room for a retry within "
+                     f"{REQUEST_DEADLINE}s - request deadline raised to {self.deadline_for(self.timeout)}s")
         
         # Test credentials from review request
         self.admin_email = "admin@ystore.ua"
         self.admin_password = "admin123"
         self.test_user_id = "test-user-123"  # For timeline testing
+        self.timeline_endpoint = self._URLS["timeline"](self.test_user_id)
 
     def log_result(self, name, success, details=""):
         """Log test result"""
-        self.tests_run += 1
+        with self._lock:
+            self.tests_run += 1
+            if success:
+                self.tests_passed += 1
         if success:
-            self.tests_passed += 1
-            print(f"✅ {name} - PASSED {details}")
+            self.log(f"✅ {name} - PASSED {details}")
         else:
-            print(f"❌ {name} - FAILED {details}")
+            self.log(f"❌ {name} - FAILED {details}")
         return success
 
-    def make_request(self, method, endpoint, data=None, headers=None, expect_status=200):
-        """Make HTTP request with error handling"""
-        url = f"{self.base_url}/api{endpoint}"
-        req_headers = {'Content-Type': 'application/json'}
-        if headers:
-            req_headers.update(headers)
-        
-        print(f"Making {method} request to: {url}")
+    def log(self, line):
+        """Queue a line for the writer thread; safe to call from any worker"""
+        self._log_q.put(line)
+
+    def _drain_log(self):
+        # The writer must outlive any write error - flush_log() joins on this queue
+        while True:
+            line = self._log_q.get()
+            try:
+                if line is _LOG_DONE:
+                    return
+                self._write_line(line)
+            except Exception:
+                pass  # stdout is gone (e.g. BrokenPipe under `| head`) - keep draining
+            finally:
+                self._log_q.task_done()
+
+    @staticmethod
+    def _write_line(line):
+        try:
+            sys.stdout.write(line + "\n")
+        except UnicodeEncodeError:
+            # Non-UTF-8 pipe: degrade the emoji instead of dropping the line
+            encoding = sys.stdout.encoding or 'ascii'
+            sys.stdout.write((line + "\n").encode(encoding, 'replace').decode(encoding))
+
+    def flush_log(self):
+        """Block until every queued line has been written"""
+        if self._drainer.is_alive():
+            self._log_q.join()
+        sys.stdout.flush()
+
+    def close_log(self):
+        """Write out what is queued and stop the writer thread"""
+        if self._drainer.is_alive():
+            self._log_q.put(_LOG_DONE)
+            self._drainer.join()
+        sys.stdout.flush()
+
+    @staticmethod
+    def parse_timeout(value):
+        """Parse "read" or "connect,read" seconds; None when unset"""
+        if not value:
+            return None
+        parts = tuple(float(part) for part in value.split(','))
+        return parts[0] if len(parts) == 1 else parts
+
+    @staticmethod
+    def attempt_seconds(timeout):
+        """Worst-case seconds of one attempt: connect + read (a bare number applies to both)"""
+        return sum(timeout) if isinstance(timeout, tuple) else 2 * timeout
+
+    @classmethod
+    def deadline_for(cls, timeout):
+        """REQUEST_DEADLINE, stretched so a custom timeout still allows one retry"""
+        return max(REQUEST_DEADLINE, 2 * cls.attempt_seconds(timeout) + RETRY_HEADROOM)
+
+    def send(self, method, endpoint, body=None, headers=None, timeout=None, raw_body=None):
+        """Single dispatch point - any HTTP method goes through session.request"""
+        url = self.api_root + endpoint
+        if self.verbose:
+            self.log(f"Making {method} request to: {url}")
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is None:
+            # Defaults are sized to fit REQUEST_DEADLINE as is
+            timeout = READ_TIMEOUT if method in ('GET', 'HEAD') else WRITE_TIMEOUT
+            deadline = REQUEST_DEADLINE
+        else:
+            deadline = self.deadline_for(timeout)
+        _send_budget.value = (time.monotonic() + deadline, self.attempt_seconds(timeout))
+        try:
+            return self.session.request(method, url, json=body, data=raw_body, headers=headers, timeout=timeout)
+        finally:
+            _send_budget.value = None
+
+    def switch_to_fallback(self, failed_base, error):
+        """Move base_url to the fallback after failed_base was unreachable; True if worth retrying.
+        Only an error where nothing reached the server qualifies - otherwise the call may have run."""
+        if not request_never_sent(error):
+            return False
+        with self._fallback_lock:
+            if self.base_url != failed_base:
+                return True  # another worker already switched
+            if self.fallback_url is None:
+                return False
+            self.log(f"External URL unreachable, switching to localhost for remaining tests")
+            self.base_url, self.fallback_url = self.fallback_url, None
+            self.api_root = self.base_url.rstrip('/') + '/api'
+            return True
+
+    def make_request(self, method, endpoint, data=None, headers=None, expect_status=200, timeout=None,
+                     raw_body=None, parse_body=True):
+        """Make HTTP request with error handling; raw_body is pre-encoded JSON sent untouched.
+        Pass parse_body=False when only the status code matters - data is then None."""
+        body = data if method in ('POST', 'PUT', 'PATCH') and raw_body is None else None
         
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=req_headers, timeout=30)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=req_headers, timeout=30)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=req_headers, timeout=30)
-            else:
-                return None, f"Unsupported method: {method}"
-            
-            # If external URL fails with 404 and we have a fallback, try localhost
-            if response.status_code == 404 and self.fallback_url and self.base_url != self.fallback_url:
-                print(f"External URL failed with 404, trying localhost...")
-                url = f"{self.fallback_url}/api{endpoint}"
-                print(f"Making {method} request to: {url}")
-                
-                if method == 'GET':
-                    response = requests.get(url, headers=req_headers, timeout=30)
-                elif method == 'POST':
-                    response = requests.post(url, json=data, headers=req_headers, timeout=30)
-                elif method == 'PUT':
-                    response = requests.put(url, json=data, headers=req_headers, timeout=30)
-                
-                # Update base_url to use localhost for future requests
-                self.base_url = self.fallback_url
-                print(f"Switched to localhost for remaining tests")
+            failed_base = self.base_url
+            try:
+                response = self.send(method, endpoint, body, headers, timeout, raw_body)
+            except requests.exceptions.ConnectionError as e:
+                # Fail over only if the external URL was unreachable. A read timeout or a reset after
+                # sending means the request may have run there - re-sending a write would run it twice.
+                if not self.switch_to_fallback(failed_base, e):
+                    raise
+                response = self.send(method, endpoint, body, headers, timeout, raw_body)
             
             success = response.status_code == expect_status
-            result_data = {}
-            try:
-                result_data = response.json()
-            except:
+            if not parse_body:
+                result_data = None
+            elif response.content and 'json' in response.headers.get('Content-Type', ''):
+                result_data = json_loads(response.content)
+            else:
+                # HTML error pages, empty 204s and other non-JSON bodies
                 result_data = {"text": response.text}
             
             return {
@@ -113,9 +353,88 @@ class YStoreAPITester:
         except Exception as e:
             return None, f"Request failed: {str(e)}"
 
+    def has_shape(self, name, data):
+        """Check a response body against its entry in _SHAPES"""
+        if not isinstance(data, dict):
+            return False
+        required, any_of = self._SHAPES[name]
+        return required <= data.keys() and (not any_of or not any_of.isdisjoint(data))
+
+    def map_concurrently(self, fn, items):
+        """Apply fn to items in parallel over the shared session, results in order"""
+        with ThreadPoolExecutor(max_workers=min(len(items), self.max_workers)) as ex:
+            return list(ex.map(fn, items))
+
+    def run_concurrently(self, tests):
+        """Run independent test methods in parallel"""
+        return self.map_concurrently(lambda test: test(), tests)
+
+    def set_admin_token(self, token):
+        """Store token and send it on every subsequent session request"""
+        self.admin_token = token
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def load_cached_token(self):
+        """Return a cached admin token if it is still valid for this backend"""
+        if not self.use_token_cache:
+            return None
+        try:
+            with open(TOKEN_CACHE_PATH) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if cached.get("base_url") != self.base_url or cached.get("email") != self.admin_email:
+            return None
+        if cached.get("exp", 0) <= time.time():
+            return None
+        
+        # Make sure the server still accepts it
+        response, error = self.make_request(
+            'GET', '/v2/admin/guard/incidents',
+            headers={"Authorization": f"Bearer {cached.get('token')}"},
+            parse_body=False
+        )
+        if error or not response["success"]:
+            return None
+        return cached["token"]
+
+    def token_expiry(self, token):
+        """Cache deadline for token: TOKEN_CACHE_TTL, capped by the JWT's own exp claim"""
+        deadline = time.time() + TOKEN_CACHE_TTL
+        try:
+            payload = token.split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return min(deadline, float(claims["exp"]) - TOKEN_EXPIRY_MARGIN)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            # Not a JWT (or no exp claim) - fall back to the fixed TTL
+            return deadline
+
+    def save_cached_token(self):
+        if not self.use_token_cache:
+            return
+        try:
+            # Live admin bearer - owner-only, also when the file already existed
+            fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                os.chmod(TOKEN_CACHE_PATH, 0o600)
+                json.dump({
+                    "base_url": self.base_url,
+                    "email": self.admin_email,
+                    "token": self.admin_token,
+                    "exp": self.token_expiry(self.admin_token)
+                }, f)
+        except OSError as e:
+            self.log(f"Could not cache admin token: {e}")
+
     def test_admin_login(self):
         """Test admin authentication"""
-        print(f"\n🔍 Testing admin login...")
+        self.log(f"\n🔍 Testing admin login...")
+        
+        cached_token = self.load_cached_token()
+        if cached_token:
+            self.set_admin_token(cached_token)
+            return self.log_result("Admin Login", True, "Cached token reused")
         
         response, error = self.make_request(
             'POST', '/auth/login',
@@ -129,10 +448,12 @@ class YStoreAPITester:
             return self.log_result("Admin Login", False, f"Error: {error}")
         
         if response["success"] and response["data"].get("token"):
-            self.admin_token = response["data"]["token"]
+            self.set_admin_token(response["data"]["token"])
+            self.save_cached_token()
             return self.log_result("Admin Login", True, "Token obtained")
         elif response["success"] and response["data"].get("access_token"):
-            self.admin_token = response["data"]["access_token"]
+            self.set_admin_token(response["data"]["access_token"])
+            self.save_cached_token()
             return self.log_result("Admin Login", True, "Access token obtained")
         else:
             return self.log_result("Admin Login", False, 
@@ -140,16 +461,13 @@ class YStoreAPITester:
 
     def test_guard_incidents_list(self):
         """Test GET /api/v2/admin/guard/incidents"""
-        print(f"\n🔍 Testing Guard incidents list...")
+        self.log(f"\n🔍 Testing Guard incidents list...")
         
         if not self.admin_token:
             return self.log_result("Guard Incidents List", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'GET', '/v2/admin/guard/incidents',
-            headers=headers,
             expect_status=200
         )
         
@@ -158,7 +476,7 @@ class YStoreAPITester:
         
         if response["success"]:
             data = response["data"]
-            has_items = "items" in data
+            has_items = self.has_shape("guard_incidents", data)
             return self.log_result("Guard Incidents List", has_items,
                 f"Found {len(data.get('items', []))} incidents")
         else:
@@ -167,57 +485,40 @@ class YStoreAPITester:
 
     def test_guard_incident_actions(self):
         """Test guard incident mute/resolve actions"""
-        print(f"\n🔍 Testing Guard incident actions...")
+        self.log(f"\n🔍 Testing Guard incident actions...")
         
         if not self.admin_token:
             return self.log_result("Guard Incident Actions", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
         test_key = "test-incident-key"
         
-        # Test mute incident
-        response, error = self.make_request(
-            'POST', f'/v2/admin/guard/incident/{test_key}/mute',
-            data={"hours": 1},
-            headers=headers,
-            expect_status=200
-        )
-        
-        if error:
-            mute_result = self.log_result("Guard Mute Incident", False, f"Error: {error}")
-        else:
-            mute_success = response["success"] or response["status_code"] == 404  # Not found is acceptable
-            mute_result = self.log_result("Guard Mute Incident", mute_success,
-                f"Status: {response['status_code']}")
-        
-        # Test resolve incident
-        response, error = self.make_request(
-            'POST', f'/v2/admin/guard/incident/{test_key}/resolve',
-            headers=headers,
-            expect_status=200
-        )
+        # Mute and resolve are independent, so send both at once
+        actions = [
+            ("Guard Mute Incident", self._URLS["guard_mute"](test_key), self._BODIES["guard_mute"]),
+            ("Guard Resolve Incident", self._URLS["guard_resolve"](test_key), None),
+        ]
         
-        if error:
-            resolve_result = self.log_result("Guard Resolve Incident", False, f"Error: {error}")
-        else:
-            resolve_success = response["success"] or response["status_code"] == 404  # Not found is acceptable
-            resolve_result = self.log_result("Guard Resolve Incident", resolve_success,
-                f"Status: {response['status_code']}")
+        def run_action(action):
+            name, endpoint, raw_body = action
+            response, error = self.make_request('POST', endpoint, raw_body=raw_body, expect_status=200,
+                                                parse_body=False)
+            if error:
+                return self.log_result(name, False, f"Error: {error}")
+            success = response["success"] or response["status_code"] == 404  # Not found is acceptable
+            return self.log_result(name, success, f"Status: {response['status_code']}")
         
+        mute_result, resolve_result = self.map_concurrently(run_action, actions)
         return mute_result and resolve_result
 
     def test_risk_distribution(self):
         """Test GET /api/v2/admin/risk/distribution"""
-        print(f"\n🔍 Testing Risk distribution...")
+        self.log(f"\n🔍 Testing Risk distribution...")
         
         if not self.admin_token:
             return self.log_result("Risk Distribution", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'GET', '/v2/admin/risk/distribution',
-            headers=headers,
             expect_status=200
         )
         
@@ -226,7 +527,7 @@ class YStoreAPITester:
         
         if response["success"]:
             data = response["data"]
-            has_distribution = "distribution" in data
+            has_distribution = self.has_shape("risk_distribution", data)
             return self.log_result("Risk Distribution", has_distribution,
                 f"Distribution data: {data.get('distribution', {})}")
         else:
@@ -235,16 +536,13 @@ class YStoreAPITester:
 
     def test_timeline_events(self):
         """Test GET /api/v2/admin/timeline/{user_id}"""
-        print(f"\n🔍 Testing Timeline events...")
+        self.log(f"\n🔍 Testing Timeline events...")
         
         if not self.admin_token:
             return self.log_result("Timeline Events", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
-            'GET', f'/v2/admin/timeline/{self.test_user_id}',
-            headers=headers,
+            'GET', self.timeline_endpoint,
             expect_status=200
         )
         
@@ -253,7 +551,7 @@ class YStoreAPITester:
         
         if response["success"]:
             data = response["data"]
-            has_events = "events" in data and "count" in data
+            has_events = self.has_shape("timeline", data)
             return self.log_result("Timeline Events", has_events,
                 f"Found {data.get('count', 0)} events")
         else:
@@ -262,16 +560,13 @@ class YStoreAPITester:
 
     def test_analytics_ops_kpi(self):
         """Test GET /api/v2/admin/analytics/ops-kpi?range=7"""
-        print(f"\n🔍 Testing Analytics OPS KPI...")
+        self.log(f"\n🔍 Testing Analytics OPS KPI...")
         
         if not self.admin_token:
             return self.log_result("Analytics OPS KPI", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'GET', '/v2/admin/analytics/ops-kpi?range=7',
-            headers=headers,
             expect_status=200
         )
         
@@ -281,7 +576,7 @@ class YStoreAPITester:
         if response["success"]:
             data = response["data"]
             # Check for typical KPI fields
-            has_kpi_data = any(field in data for field in ["revenue", "orders", "aov", "delivered"])
+            has_kpi_data = self.has_shape("ops_kpi", data)
             return self.log_result("Analytics OPS KPI", has_kpi_data,
                 f"KPI fields: {list(data.keys())}")
         else:
@@ -290,17 +585,14 @@ class YStoreAPITester:
 
     def test_analytics_daily_rebuild(self):
         """Test POST /api/v2/admin/analytics/daily/rebuild"""
-        print(f"\n🔍 Testing Analytics daily rebuild...")
+        self.log(f"\n🔍 Testing Analytics daily rebuild...")
         
         if not self.admin_token:
             return self.log_result("Analytics Daily Rebuild", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'POST', '/v2/admin/analytics/daily/rebuild',
-            data={"days": 3},  # Small number for testing
-            headers=headers,
+            raw_body=self._BODIES["daily_rebuild"],
             expect_status=200
         )
         
@@ -309,7 +601,7 @@ class YStoreAPITester:
         
         if response["success"]:
             data = response["data"]
-            has_rebuild_data = "ok" in data and "rebuilt" in data
+            has_rebuild_data = self.has_shape("daily_rebuild", data)
             return self.log_result("Analytics Daily Rebuild", has_rebuild_data,
                 f"Rebuilt {data.get('rebuilt', 0)} days")
         else:
@@ -318,16 +610,13 @@ class YStoreAPITester:
 
     def test_pickup_control_kpi(self):
         """Test GET /api/v2/admin/pickup-control/kpi"""
-        print(f"\n🔍 Testing Pickup Control KPI...")
+        self.log(f"\n🔍 Testing Pickup Control KPI...")
         
         if not self.admin_token:
             return self.log_result("Pickup Control KPI", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'GET', '/v2/admin/pickup-control/kpi',
-            headers=headers,
             expect_status=200
         )
         
@@ -336,9 +625,7 @@ class YStoreAPITester:
         
         if response["success"]:
             data = response["data"]
-            # Check for expected KPI fields
-            kpi_fields = ["at_point_2plus", "at_point_5plus", "at_point_7plus", "amount_at_risk"]
-            has_kpi_structure = any(field in data for field in kpi_fields)
+            has_kpi_structure = self.has_shape("pickup_kpi", data)
             return self.log_result("Pickup Control KPI", has_kpi_structure,
                 f"KPI data: {data}")
         else:
@@ -347,16 +634,13 @@ class YStoreAPITester:
 
     def test_pickup_control_risk_list(self):
         """Test GET /api/v2/admin/pickup-control/risk?days=5"""
-        print(f"\n🔍 Testing Pickup Control Risk List...")
+        self.log(f"\n🔍 Testing Pickup Control Risk List...")
         
         if not self.admin_token:
             return self.log_result("Pickup Control Risk List", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'GET', '/v2/admin/pickup-control/risk?days=5&limit=100',
-            headers=headers,
             expect_status=200
         )
         
@@ -366,7 +650,7 @@ class YStoreAPITester:
         if response["success"]:
             data = response["data"]
             # Should have items, count, and filter_days fields
-            has_structure = "items" in data and "count" in data and "filter_days" in data
+            has_structure = self.has_shape("pickup_risk_list", data)
             return self.log_result("Pickup Control Risk List", has_structure,
                 f"Found {data.get('count', 0)} risk items, filter: {data.get('filter_days')} days")
         else:
@@ -375,17 +659,14 @@ class YStoreAPITester:
 
     def test_pickup_control_run_engine(self):
         """Test POST /api/v2/admin/pickup-control/run"""
-        print(f"\n🔍 Testing Pickup Control Run Engine...")
+        self.log(f"\n🔍 Testing Pickup Control Run Engine...")
         
         if not self.admin_token:
             return self.log_result("Pickup Control Run Engine", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         response, error = self.make_request(
             'POST', '/v2/admin/pickup-control/run',
-            data={"limit": 50},  # Small limit for testing
-            headers=headers,
+            raw_body=self._BODIES["pickup_run"],
             expect_status=200
         )
         
@@ -395,7 +676,7 @@ class YStoreAPITester:
         if response["success"]:
             data = response["data"]
             # Should have processing results
-            has_result_structure = all(field in data for field in ["ok", "processed", "sent", "high_risk_count", "errors"])
+            has_result_structure = self.has_shape("pickup_run", data)
             return self.log_result("Pickup Control Run Engine", has_result_structure,
                 f"Processed: {data.get('processed', 0)}, Sent: {data.get('sent', 0)}, Risk: {data.get('high_risk_count', 0)}")
         else:
@@ -404,18 +685,16 @@ class YStoreAPITester:
 
     def test_pickup_control_mute_ttn(self):
         """Test POST /api/v2/admin/pickup-control/mute/{ttn}"""
-        print(f"\n🔍 Testing Pickup Control Mute TTN...")
+        self.log(f"\n🔍 Testing Pickup Control Mute TTN...")
         
         if not self.admin_token:
             return self.log_result("Pickup Control Mute TTN", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
         test_ttn = "20450123456789"  # Test TTN
         
         response, error = self.make_request(
-            'POST', f'/v2/admin/pickup-control/mute/{test_ttn}',
-            data={"days": 7},
-            headers=headers,
+            'POST', self._URLS["mute"](test_ttn),
+            raw_body=self._BODIES["pickup_mute"],
             expect_status=200
         )
         
@@ -425,7 +704,7 @@ class YStoreAPITester:
         if response["success"]:
             data = response["data"]
             # Should confirm mute operation
-            has_mute_structure = "ok" in data and "ttn" in data and "muted_days" in data
+            has_mute_structure = self.has_shape("pickup_mute", data)
             return self.log_result("Pickup Control Mute TTN", has_mute_structure,
                 f"Muted TTN: {data.get('ttn')}, Days: {data.get('muted_days')}")
         else:
@@ -434,18 +713,16 @@ class YStoreAPITester:
 
     def test_pickup_control_send_reminder(self):
         """Test POST /api/v2/admin/pickup-control/send-reminder/{ttn}"""
-        print(f"\n🔍 Testing Pickup Control Send Reminder...")
+        self.log(f"\n🔍 Testing Pickup Control Send Reminder...")
         
         if not self.admin_token:
             return self.log_result("Pickup Control Send Reminder", False, "No admin token")
         
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
         test_ttn = "20450123456789"  # Test TTN
         
         response, error = self.make_request(
-            'POST', f'/v2/admin/pickup-control/send-reminder/{test_ttn}',
-            data={"level": "D5"},
-            headers=headers,
+            'POST', self._URLS["reminder"](test_ttn),
+            raw_body=self._BODIES["pickup_reminder"],
             expect_status=404  # Expected since test order doesn't exist
         )
         
@@ -458,7 +735,7 @@ class YStoreAPITester:
                 "404 as expected (no test orders exist)")
         elif response["success"]:
             data = response["data"]
-            has_reminder_structure = "ok" in data and "ttn" in data
+            has_reminder_structure = self.has_shape("pickup_reminder", data)
             return self.log_result("Pickup Control Send Reminder", has_reminder_structure,
                 f"Reminder sent for TTN: {data.get('ttn')}")
         else:
@@ -467,32 +744,36 @@ class YStoreAPITester:
 
     def test_admin_authentication_required(self):
         """Test that admin authentication is required for all endpoints"""
-        print(f"\n🔍 Testing admin authentication requirement...")
+        self.log(f"\n🔍 Testing admin authentication requirement...")
         
         endpoints_to_test = [
             '/v2/admin/guard/incidents',
             '/v2/admin/risk/distribution',
-            f'/v2/admin/timeline/{self.test_user_id}',
+            self.timeline_endpoint,
             '/v2/admin/analytics/ops-kpi?range=7',
             '/v2/admin/pickup-control/kpi',
             '/v2/admin/pickup-control/risk?days=5'
         ]
         
+        # Probes are independent - fire them together, report in order
+        responses = self.map_concurrently(
+            # None drops the session-level Authorization header for this call
+            lambda endpoint: self.make_request(
+                'GET', endpoint, headers={"Authorization": None}, expect_status=403, parse_body=False
+            ),
+            endpoints_to_test
+        )
+        
         results = []
-        for endpoint in endpoints_to_test:
-            response, error = self.make_request(
-                'GET', endpoint,
-                expect_status=403
-            )
-            
+        for endpoint, (response, error) in zip(endpoints_to_test, responses):
             if error:
                 results.append(False)
-                print(f"   ❌ {endpoint}: Error - {error}")
+                self.log(f"   ❌ {endpoint}: Error - {error}")
             else:
                 # Accept 401/403 as valid auth required responses
                 auth_required = response["status_code"] in [401, 403]
                 results.append(auth_required)
-                print(f"   {'✅' if auth_required else '❌'} {endpoint}: Status {response['status_code']}")
+                self.log(f"   {'✅' if auth_required else '❌'} {endpoint}: Status {response['status_code']}")
         
         success = all(results)
         return self.log_result("Auth Required", success, f"{sum(results)}/{len(results)} endpoints protected")
@@ -502,29 +783,42 @@ class YStoreAPITester:
         print("🚀 Starting Y-Store O13-O20 Module Tests")
         print("=" * 60)
         
+        try:
+            return self._run_all_tests()
+        finally:
+            self.close_log()
+            self.session.close()
+
+    def _run_all_tests(self):
         # Basic connectivity and authentication
         if not self.test_admin_login():
+            self.flush_log()
             print("❌ Admin login failed - stopping tests")
             return False
         
         # Test authentication requirements
         self.test_admin_authentication_required()
         
-        # Test individual modules
-        self.test_guard_incidents_list()
-        self.test_guard_incident_actions()
-        self.test_risk_distribution()
-        self.test_timeline_events()
-        self.test_analytics_ops_kpi()
-        self.test_analytics_daily_rebuild()
+        # Probes share no state after login - run them concurrently.
+        # Guard actions target a synthetic incident key and the daily rebuild
+        # only changes analytics rows, neither of which the other probes assert on.
+        self.run_concurrently([
+            self.test_guard_incidents_list,
+            self.test_guard_incident_actions,
+            self.test_risk_distribution,
+            self.test_timeline_events,
+            self.test_analytics_ops_kpi,
+            self.test_analytics_daily_rebuild,
+            self.test_pickup_control_kpi,
+            self.test_pickup_control_risk_list,
+        ])
         
         # Test O20 Pickup Control module
-        self.test_pickup_control_kpi()
-        self.test_pickup_control_risk_list()
         self.test_pickup_control_run_engine()
         self.test_pickup_control_mute_ttn()
         self.test_pickup_control_send_reminder()
         
+        self.flush_log()
         print("\n" + "=" * 60)
         print(f"📊 Test Results: {self.tests_passed}/{self.tests_run} passed")
         print("=" * 60)
@@ -532,10 +826,67 @@ class YStoreAPITester:
         return self.tests_passed >= (self.tests_run * 0.7)  # 70% pass rate acceptable
 
 
+def scrub_cassette_response(response):
+    """before_record_response hook: blank issued tokens in JSON bodies"""
+    try:
+        body = json.loads(response['body']['string'])
+    except (KeyError, TypeError, ValueError):
+        return response
+    if isinstance(body, dict) and not CASSETTE_SECRET_KEYS.isdisjoint(body):
+        for key in CASSETTE_SECRET_KEYS.intersection(body):
+            body[key] = CASSETTE_REDACTED
+        response['body']['string'] = json.dumps(body).encode()
+    return response
+
+
+def match_auth(r1, r2):
+    """vcr matcher: an authenticated call never replays an anonymous one (or vice versa)"""
+    assert ('Authorization' in r1.headers) == ('Authorization' in r2.headers)
+
+
 def main():
     """Main test runner"""
-    tester = YStoreAPITester()
-    success = tester.run_all_tests()
+    parser = argparse.ArgumentParser(description="Y-Store O13-O20 admin API tests")
+    parser.add_argument('--replay', action='store_true',
+                        help=f"record responses on first run and replay them afterwards ({CASSETTE_PATH})")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete the recorded cassette and cached admin token before running")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print every request URL (same as VERBOSE=1)")
+    args = parser.parse_args()
+    
+    if args.clear_cache:
+        for path in (CASSETTE_PATH, TOKEN_CACHE_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Removed {path}")
+    
+    # Replays answer the cached-token probe from the cassette, so always log in instead.
+    # vcrpy drops interactions recorded from several threads at once - record/replay serially.
+    tester = YStoreAPITester(
+        verbose=args.verbose or VERBOSE,
+        use_token_cache=not args.replay,
+        max_workers=1 if args.replay else MAX_WORKERS,
+    )
+    if args.replay:
+        if vcr is None:
+            print("❌ --replay requires vcrpy (pip install vcrpy)")
+            return 1
+        recorder = vcr.VCR()
+        recorder.register_matcher('auth', match_auth)
+        with recorder.use_cassette(
+            CASSETTE_PATH,
+            record_mode='new_episodes',
+            match_on=['method', 'scheme', 'host', 'path', 'query', 'auth'],
+            filter_headers=[('Authorization', CASSETTE_AUTH_PLACEHOLDER)],
+            filter_post_data_parameters=[(field, CASSETTE_REDACTED) for field in CASSETTE_SECRET_FIELDS],
+            # Decompress first so the token scrubber sees plain JSON
+            decode_compressed_response=True,
+            before_record_response=scrub_cassette_response,
+        ):
+            success = tester.run_all_tests()
+    else:
+        success = tester.run_all_tests()
     
     if success:
         print("🎉 Tests completed successfully!")